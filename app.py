@@ -1,12 +1,100 @@
 from fastapi import FastAPI, HTTPException, Path
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-import aiohttp
+import httpx
 import ssl
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 import certifi
+import orjson
 from datetime import datetime
 import asyncio
-app = FastAPI()
+from collections import deque
+import random
+import time
+import hashlib
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from contextlib import asynccontextmanager
+
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:  # uvloop is unavailable on Windows; fall back to the stdlib loop
+    pass
+
+# Built once at import: parsing the certifi CA bundle is expensive.
+SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+
+# Headers shared by every Twitter API request; per-user auth headers are merged in by each endpoint.
+STATIC_HEADERS = {
+    "User-Agent": "Mozilla/5.0 ...",
+    'x-twitter-active-user': 'yes',
+    'x-twitter-auth-type': 'OAuth2Session',
+    'x-twitter-client-language': 'en',
+    'accept': 'application/json, text/plain, */*',
+    'origin': 'https://x.com',
+    'referer': 'https://x.com.messages',
+}
+
+# Twitter statuses worth retrying (rate limiting and transient server errors) and the retry budget per page.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Transport failures that can succeed on a fresh attempt; local errors (e.g. an illegal header value) are not retried.
+RETRY_TRANSPORT_ERRORS = (httpx.NetworkError, httpx.TimeoutException, httpx.RemoteProtocolError)
+MAX_RETRIES = 5
+
+INBOX_URL = "https://twitter.com/i/api/1.1/dm/inbox_initial_state"
+
+# Parsed inbox pages keyed by (bearer token, SHA-256 of the Cookie header, cursor) -> (fetched_at, payload).
+# The Cookie header carries the auth_token session secret, so entries are never shared between users,
+# and only its digest is kept in memory. Entries are stored in fetch order, oldest first.
+INBOX_CACHE_TTL = 30  # seconds
+INBOX_CACHE_MAXSIZE = 64
+INBOX_CACHE: Dict[tuple, tuple] = {}
+
+
+class RejectAllCookiesPolicy(DefaultCookiePolicy):
+    """
+    1) Parameters:
+       - None
+    2) Returns:
+       - None (This is a cookie policy class)
+    3) Working:
+       - Refuses every Set-Cookie value from responses, so the shared client never stores one
+         user's cookies and replays them on another user's requests.
+    """
+    def set_ok(self, cookie, request):
+        return False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    1) Parameters:
+       - app [FastAPI]: The application being started.
+    2) Returns:
+       - None (yields control to the application while it serves requests)
+    3) Working:
+       - Stores a single HTTP/2-enabled httpx AsyncClient on app.state, verifying certificates with the
+         module-level SSL context, so every endpoint reuses the same keep-alive connections.
+       - With HTTP/2, concurrent requests to the same host are multiplexed over a few connections
+         instead of each needing its own TCP+TLS handshake; HTTP/1.1 is used if the server doesn't offer h2.
+       - Gives the client a cookie jar that rejects all cookies; each request sends only the caller's
+         own Cookie header.
+       - Closes the client and its pooled connections on shutdown.
+    """
+    app.state.client = httpx.AsyncClient(
+        http2=True,
+        verify=SSL_CONTEXT,
+        cookies=CookieJar(policy=RejectAllCookiesPolicy()),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=75),
+        timeout=httpx.Timeout(300.0)  # generous: inbox and conversation pages can be large
+    )
+    try:
+        yield
+    finally:
+        await app.state.client.aclose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 class AuthData(BaseModel):
@@ -23,16 +111,34 @@ class AuthData(BaseModel):
     bearer_token: str
 
 
-class UsersPayload(BaseModel):
+class PartialFetchError(HTTPException):
     """
     1) Parameters:
-       - users [Dict[str, Dict[str, Any]]]: Raw users dictionary from Twitter API response.
+       - status_code [int]: HTTP status code of the failed request.
+       - detail [str]: Human readable error detail.
+       - messages [List[Dict[str, Any]]]: Messages fetched before the failure.
     2) Returns:
-       - None (This is a data model class)
+       - None (This is an exception class)
     3) Working:
-       - Defines expected structure for users data payload from API.
+       - HTTPException raised when a conversation fails mid-pagination, carrying the messages
+         already collected so callers can surface partial results.
     """
-    users: Dict[str, Dict[str, Any]]  # Raw users dict from Twitter API
+    def __init__(self, status_code: int, detail: str, messages: List[Dict[str, Any]]):
+        super().__init__(status_code=status_code, detail=detail)
+        self.messages = messages
+
+
+def ReadJSON(resp: httpx.Response) -> Any:
+    """
+    1) Parameters:
+       - resp [httpx.Response]: Response object from an httpx request.
+    2) Returns:
+       - data [Any]: Parsed JSON body of the response.
+    3) Working:
+       - Takes the raw response body as bytes.
+       - Decodes it with orjson, which is considerably faster than stdlib json on large inbox payloads.
+    """
+    return orjson.loads(resp.content)
 
 
 def FormatCookieHeader(cookies: dict) -> str:
@@ -59,18 +165,14 @@ def ExtractConversationIds(payload: dict) -> List[str]:
        - Extracts 'inbox_initial_state' key from payload.
        - Iterates through 'entries' list inside inbox state.
        - For each entry, extracts the 'conversation_id' from message if present.
-       - Returns all found conversation IDs as a list.
+       - Returns all found conversation IDs as a list (built with a single list comprehension).
     """
-    conversation_ids = []
-    inbox_state = payload.get('inbox_initial_state', {})
-    entries = inbox_state.get('entries', [])
-    for entry in entries:
-        message = entry.get('message')
-        if message:
-            conv_id = message.get('conversation_id')
-            if conv_id:
-                conversation_ids.append(conv_id)
-    return conversation_ids
+    entries = payload.get('inbox_initial_state', {}).get('entries', ())
+    return [
+        conv_id
+        for entry in entries
+        if (message := entry.get('message')) and (conv_id := message.get('conversation_id'))
+    ]
 
 
 def ExtractUsersMetadata(users_dict: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
@@ -83,19 +185,129 @@ def ExtractUsersMetadata(users_dict: Dict[str, Dict[str, Any]]) -> Dict[str, Dic
     3) Working:
        - Iterates over each user in the raw users dictionary.
        - Extracts 'name' and 'screen_name' fields, defaulting to empty strings if missing.
-       - Constructs a simplified dictionary with user_id as key and a dictionary of
-         the two fields as value.
+       - Constructs a simplified dictionary (via a dict comprehension) with user_id as key
+         and a dictionary of the two fields as value.
        - Returns the simplified users dictionary.
     """
-    result = {}
-    for user_id_str, user_info in users_dict.items():
-        result[user_id_str] = {
-            "name": user_info.get("name", ""),
-            "screen_name": user_info.get("screen_name", "")
+    get = dict.get  # local alias skips the per-user attribute lookup
+    return {
+        user_id_str: {
+            "name": get(user_info, "name", ""),
+            "screen_name": get(user_info, "screen_name", "")
         }
-    return result
+        for user_id_str, user_info in users_dict.items()
+    }
+
+async def GetJSONWithRetry(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    params: Optional[dict] = None,
+    error_detail: Optional[str] = None
+) -> Any:
+    """
+    1) Parameters:
+       - client [httpx.AsyncClient]: Shared HTTP client used for the request.
+       - url [str]: URL to fetch.
+       - headers [dict]: HTTP headers including authorization and cookies.
+       - params [Optional[dict]]: Query parameters for the request.
+       - error_detail [Optional[str]]: Detail used for the HTTPException if the request ultimately fails;
+         defaults to the response body text.
+    2) Returns:
+       - data [Any]: Parsed JSON body of the successful response.
+    3) Working:
+       - Performs the GET request and returns the parsed JSON on a 200 response.
+       - On a status in RETRY_STATUSES, waits for the 'Retry-After' header value capped at 2**attempt
+         seconds (or 2**attempt if the header is missing), plus up to 250ms of jitter, and retries.
+       - Transient transport failures in RETRY_TRANSPORT_ERRORS (dropped connections, timeouts, HTTP/2 GOAWAY)
+         are retried with the same backoff, since a lost multiplexed connection fails every stream on it at once.
+         Other transport errors, such as an illegal header value, propagate immediately.
+       - Raises HTTPException on any other status, or once MAX_RETRIES retries are exhausted
+         (502 if the last attempt failed at the transport level).
+    """
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            resp = await client.get(url, params=params, headers=headers)
+        except RETRY_TRANSPORT_ERRORS as e:
+            if attempt >= MAX_RETRIES:
+                raise HTTPException(status_code=502, detail=error_detail or f"Upstream request failed: {e!r}")
+        else:
+            if resp.status_code == 200:
+                return ReadJSON(resp)
+            if resp.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                raise HTTPException(status_code=resp.status_code, detail=error_detail or resp.text)
+            retry_after = resp.headers.get("Retry-After")
+
+        backoff = 2 ** attempt
+        try:
+            delay = min(float(retry_after), backoff) if retry_after else backoff
+        except ValueError:
+            delay = backoff
+        await asyncio.sleep(delay + random.uniform(0, 0.25))
+        attempt += 1
+
+
+def PurgeExpiredInboxPages(now: float) -> None:
+    """
+    1) Parameters:
+       - now [float]: Current time.monotonic() value.
+    2) Returns:
+       - None
+    3) Working:
+       - Removes entries older than INBOX_CACHE_TTL from the front of INBOX_CACHE.
+       - Stops at the first fresh entry, since entries are kept in fetch order.
+    """
+    while INBOX_CACHE:
+        oldest_key = next(iter(INBOX_CACHE))
+        if now - INBOX_CACHE[oldest_key][0] < INBOX_CACHE_TTL:
+            break
+        del INBOX_CACHE[oldest_key]
+
+
+async def FetchInboxPage(client: httpx.AsyncClient, headers: dict, cursor: Optional[str] = None) -> dict:
+    """
+    1) Parameters:
+       - client [httpx.AsyncClient]: Shared HTTP client used for the request.
+       - headers [dict]: HTTP headers including authorization, CSRF token and cookies.
+       - cursor [Optional[str]]: Pagination cursor for the inbox, or None for the first page.
+    2) Returns:
+       - data [dict]: Parsed JSON payload of the requested inbox_initial_state page.
+    3) Working:
+       - Builds a cache key from the bearer token, the SHA-256 digest of the Cookie header (which
+         includes the auth_token session secret) and cursor, so one user's pages are never served
+         to another and no raw session secrets are held in the cache.
+       - Drops expired entries, then returns the cached parsed payload if one is still present.
+       - Otherwise fetches the page through GetJSONWithRetry, which retries transient failures and
+         raises HTTPException (with the response body as detail) on any other non-200 status.
+       - Stores the parsed payload (not the raw bytes) so JSON decoding runs once per cache epoch,
+         dropping expired entries again and evicting the oldest entry once INBOX_CACHE_MAXSIZE is reached.
+    """
+    cookie_digest = hashlib.sha256(headers.get("Cookie", "").encode()).digest()
+    key = (headers.get("Authorization"), cookie_digest, cursor)
+
+    PurgeExpiredInboxPages(time.monotonic())
+    cached = INBOX_CACHE.get(key)
+    if cached:
+        return cached[1]
+
+    url = INBOX_URL
+    if cursor:
+        url += f"?cursor={cursor}"
+
+    data = await GetJSONWithRetry(client, url, headers)
+
+    now = time.monotonic()
+    PurgeExpiredInboxPages(now)
+    INBOX_CACHE.pop(key, None)
+    if len(INBOX_CACHE) >= INBOX_CACHE_MAXSIZE:
+        INBOX_CACHE.pop(next(iter(INBOX_CACHE)))
+    INBOX_CACHE[key] = (now, data)
+    return data
 
-@app.post("/fetch-initial-state")
+
+@app.post("/fetch-initial-state", response_model=None)
 async def fetch_initial_state(auth_data: AuthData):
     """
     1) Parameters:
@@ -104,113 +316,59 @@ async def fetch_initial_state(auth_data: AuthData):
            * bearer_token [str]: Bearer token string for authorization.
 
     2) Returns:
-       - dict: A dictionary containing:
+       - ORJSONResponse: A JSON response containing:
            * conversation_ids [List[str]]: List of unique conversation IDs fetched.
            * total [int]: Total count of unique conversation IDs.
 
     3) Working:
        - Extract cookies and bearer token from the request payload.
-       - Build HTTP headers including authorization, user agent, CSRF token, cookie header, and Twitter-specific headers.
-       - Create SSL context with proper certificate validation using certifi.
-       - Define base URL for Twitter's inbox initial state endpoint.
-       - Initialize an empty set to store unique conversation IDs and set cursor to None.
-       - Create an asynchronous HTTP session with the prepared headers.
-       - Enter a loop to paginate through inbox data:
-          * Append the cursor parameter to the URL if available.
-          * Perform GET request to the endpoint with SSL context.
-          * Check HTTP response status; raise HTTPException if non-200.
-          * Parse JSON response.
-          * Extract conversation IDs from the payload using ExtractConversationIds function and add to the set.
+       - Build HTTP headers by merging STATIC_HEADERS with the authorization, CSRF token, and cookie header.
+       - Initialize an empty dict used as an insertion-ordered set of unique conversation IDs.
+       - Reuse the shared HTTP client stored on app.state.
+       - Fetch the first parsed page using FetchInboxPage (served from cache when fresh).
+       - Loop while a page is available:
           * Access pagination info from 'trusted' timeline in response.
-          * If status is 'AT_END', break loop (no more pages).
-          * Otherwise, update cursor with 'min_entry_id' for next page; break if cursor is missing.
-       - Return the list of unique conversation IDs and their total count.
+          * Unless status is 'AT_END' or 'min_entry_id' is missing, start fetching the next page as a task.
+          * Extract conversation IDs from the current payload using ExtractConversationIds and add to the dict
+            while the next request is in flight.
+          * Await the next page, or stop if none was requested.
+       - Return the list of unique conversation IDs, in Twitter's inbox order (newest first), and their total count.
     """
 
     cookies = auth_data.cookies
     bearer_token = auth_data.bearer_token
 
     headers = {
+        **STATIC_HEADERS,
         "Authorization": bearer_token,
-        "User-Agent": "Mozilla/5.0",
         "x-csrf-token": cookies.get("ct0", ""),
         "Cookie": FormatCookieHeader(cookies),
-        'x-twitter-active-user':'yes',
-        'x-twitter-auth-type': 'OAuth2Session',
-        'x-twitter-client-language': 'en',
-        'accept': 'application/json, text/plain, */*',
-        'origin':'https://x.com',
-        'referer':'https://x.com.messages',
-        'connection':'keep-active'
     }
 
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-    base_url = "https://twitter.com/i/api/1.1/dm/inbox_initial_state"
-    conversation_ids = set()
-    cursor = None
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        while True:
-            url = base_url
-            if cursor:
-                url += f"?cursor={cursor}"
-
-            async with session.get(url, ssl=ssl_context) as response:
-                if response.status != 200:
-                    raise HTTPException(status_code=response.status, detail=await response.text())
-
-                data = await response.json()
+    conversation_ids: Dict[str, None] = {}  # insertion-ordered set
 
-                # Extract conversation IDs
-                new_ids = ExtractConversationIds(data)
-                conversation_ids.update(new_ids)
+    client = app.state.client
+    data = await FetchInboxPage(client, headers)
+    while data is not None:
+        # Handle pagination first so the next page is already in flight while this one is processed
+        trusted_timeline = data.get("inbox_timelines", {}).get("trusted", {})
+        status = trusted_timeline.get("status")
+        cursor = None if status == "AT_END" else trusted_timeline.get("min_entry_id")
+        next_page = asyncio.create_task(FetchInboxPage(client, headers, cursor)) if cursor else None
 
-                # Handle pagination
-                trusted_timeline = data.get("inbox_timelines", {}).get("trusted", {})
-                status = trusted_timeline.get("status")
-                if status == "AT_END":
-                    break
+        # Extract conversation IDs
+        new_ids = ExtractConversationIds(data)
+        conversation_ids.update(dict.fromkeys(new_ids))
 
-                cursor = trusted_timeline.get("min_entry_id")
-                if not cursor:
-                    break
+        data = await next_page if next_page else None
 
-    return {
+    return ORJSONResponse({
         "conversation_ids": list(conversation_ids),
         "total": len(conversation_ids)
-    }
-
-
-def ExtractUsersMetadata(users: Dict) -> Dict[str, Dict[str, str]]:
-    """
-    1) Parameters:
-       - users [Dict]: Raw users dictionary from Twitter API, keyed by user ID strings,
-         where each value is a dict with user details.
-
-    2) Returns:
-       - result [Dict[str, Dict[str, str]]]: Simplified dictionary keyed by user ID strings,
-         with each value containing only:
-           * "name" [str]: User's display name (empty string if missing).
-           * "screen_name" [str]: User's screen name (empty string if missing).
+    })
 
-    3) Working:
-       - Initialize an empty result dictionary.
-       - Iterate over each user_id and user_info in the input users dictionary.
-       - For each user, extract the "name" and "screen_name" fields safely (defaulting to "").
-       - Store these two fields in the result dict with user_id as the key.
-       - Return the simplified result dictionary.
-    """
-    result = {}
-    for user_id_str, user_info in users.items():
-        result[user_id_str] = {
-            "name": user_info.get("name", ""),
-            "screen_name": user_info.get("screen_name", "")
-        }
-    return result
 
-
-@app.post("/fetch_users_metadata")
+@app.post("/fetch_users_metadata", response_model=None)
 async def fetch_users_metadata(auth_data: AuthData):
     """
     1) Parameters:
@@ -219,7 +377,7 @@ async def fetch_users_metadata(auth_data: AuthData):
            * bearer_token [str]: Bearer token string for authorization.
 
     2) Returns:
-       - dict: A dictionary containing:
+       - ORJSONResponse: A JSON response containing:
            * user_count [int]: Number of unique users fetched.
            * users [Dict[str, Dict[str, str]]]: Simplified user metadata keyed by user ID strings,
              each containing:
@@ -228,169 +386,157 @@ async def fetch_users_metadata(auth_data: AuthData):
 
     3) Working:
        - Extract cookies and bearer token from the request payload.
-       - Construct HTTP headers including authorization, user-agent, CSRF token, cookie header,
-         and other Twitter-specific headers.
-       - Create SSL context with proper cert validation using certifi.
-       - Define base URL for Twitter's inbox initial state endpoint.
-       - Initialize empty dictionary to hold all user data and cursor as None for pagination.
-       - Start async HTTP session with headers.
-       - Loop to paginate through the inbox:
-          * Build URL, appending cursor query parameter if cursor is present.
-          * Make GET request with SSL context.
-          * If response status is not 200, raise HTTPException with error details.
-          * Parse JSON response.
+       - Construct HTTP headers by merging STATIC_HEADERS with the authorization, CSRF token,
+         and cookie header.
+       - Initialize empty dictionary to hold simplified user data.
+       - Reuse the shared HTTP client stored on app.state.
+       - Fetch the first parsed page using FetchInboxPage (served from cache when fresh).
+       - Loop while a page is available:
+          * Check pagination status from "trusted" inbox timeline and, unless status is "AT_END"
+            or no cursor is available, start fetching the next page as a task.
           * Extract users dictionary from "inbox_initial_state" or fallback to root response.
-          * Merge the newly fetched users into the cumulative dictionary.
-          * Check pagination status from "trusted" inbox timeline.
-          * Break loop if status is "AT_END" or no cursor is available.
-       - After pagination completes, simplify users metadata using ExtractUsersMetadata.
+          * Simplify the newly fetched users with ExtractUsersMetadata and merge them into the
+            cumulative dictionary, so raw user objects are never kept across pages.
+          * Await the next page, or stop if none was requested.
        - Return the count of unique users and the simplified users dictionary.
     """
     cookies = auth_data.cookies
     bearer_token = auth_data.bearer_token
 
     headers = {
+        **STATIC_HEADERS,
         "Authorization": bearer_token,
-        "User-Agent": "Mozilla/5.0 ...",
         "x-csrf-token": cookies.get("ct0", ""),
         "Cookie": FormatCookieHeader(cookies),
-        'x-twitter-active-user': 'yes',
-        'x-twitter-auth-type': 'OAuth2Session',
-        'x-twitter-client-language': 'en',
-        'accept': 'application/json, text/plain, */*',
-        'origin': 'https://x.com',
-        'referer': 'https://x.com.messages',
-        'connection': 'keep-alive',
     }
 
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    base_url = "https://twitter.com/i/api/1.1/dm/inbox_initial_state"
-
     all_users = {}
-    cursor = None
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        while True:
-            url = base_url
-            if cursor:
-                url += f"?cursor={cursor}"
-
-            async with session.get(url, ssl=ssl_context) as resp:
-                if resp.status != 200:
-                    detail = await resp.text()
-                    raise HTTPException(status_code=resp.status, detail=detail)
-                data = await resp.json()
-
-                initial_state = data.get("inbox_initial_state", data)
-                users = initial_state.get("users", {})
-                all_users.update(users)
-
-                # Pagination check
-                trusted = data.get("inbox_timelines", {}).get("trusted", {})
-                status = trusted.get("status")
-                if status == "AT_END":
-                    break
-                cursor = trusted.get("min_entry_id")
-                if not cursor:
-                    break
-
-    simplified_users = ExtractUsersMetadata(all_users)
-    return {
-        "user_count": len(simplified_users),
-        "users": simplified_users
-    }
-
 
-async def FetchDMConversations(conversation_id: str, headers: dict, ssl_context) -> List[Dict[str, Any]]:
+    client = app.state.client
+    data = await FetchInboxPage(client, headers)
+    while data is not None:
+        # Pagination check, issuing the next request before simplifying this page
+        trusted = data.get("inbox_timelines", {}).get("trusted", {})
+        status = trusted.get("status")
+        cursor = None if status == "AT_END" else trusted.get("min_entry_id")
+        next_page = asyncio.create_task(FetchInboxPage(client, headers, cursor)) if cursor else None
+
+        initial_state = data.get("inbox_initial_state", data)
+        users = initial_state.get("users", {})
+        all_users.update(ExtractUsersMetadata(users))
+
+        data = await next_page if next_page else None
+
+    return ORJSONResponse({
+        "user_count": len(all_users),
+        "users": all_users
+    })
+
+
+async def FetchDMConversations(
+    conversation_id: str,
+    headers: dict,
+    client: httpx.AsyncClient,
+    max_pages: int = 200
+) -> Tuple[List[Dict[str, Any]], bool]:
     """
     1) Parameters:
        - conversation_id [str]: The unique ID of the direct message conversation to fetch.
        - headers [dict]: HTTP headers including authorization and cookies to authenticate the request.
-       - ssl_context: SSL context object for secure HTTPS requests.
+       - client [httpx.AsyncClient]: Shared HTTP client, configured with the SSL context.
+       - max_pages [int]: Upper bound on the number of pages fetched for the conversation (default 200).
 
     2) Returns:
-       - simplified_messages [List[Dict[str, Any]]]: A list of simplified message dictionaries, each containing:
-           * sender_id [str]: ID of the sender.
-           * recipient_id [str]: ID of the recipient.
-           * text [str]: The text content of the message.
-           * timestamp [str | None]: ISO-formatted timestamp of the message, or None if unavailable.
+       - Tuple of:
+           * simplified_messages [List[Dict[str, Any]]]: A list of simplified message dictionaries, each containing:
+               - sender_id [str]: ID of the sender.
+               - recipient_id [str]: ID of the recipient.
+               - text [str]: The text content of the message.
+               - timestamp [str | None]: ISO-formatted timestamp of the message, or None if unavailable.
+           * truncated [bool]: True if max_pages was reached while older pages were still available.
 
     3) Working:
        - Construct the base URL for the conversation endpoint using the conversation ID.
        - Initialize an empty list to accumulate simplified messages.
-       - Initialize a set to track seen 'min_entry_id' values for pagination.
+       - Track the last 32 seen 'min_entry_id' values for pagination in a bounded deque,
+         mirrored by a set for constant-time lookups.
        - Set flags and counters to manage pagination.
-       - Start an aiohttp ClientSession with given headers.
-       - Enter a loop that continues while more pages exist:
+       - Enter a loop that continues while more pages exist and fewer than max_pages were fetched:
            * Build query params, including max_id for pagination if available.
-           * Make an async GET request to fetch conversation data.
-           * Raise an HTTPException if the response status is not 200.
-           * Parse JSON response.
+           * Fetch and parse the page with GetJSONWithRetry, which retries rate-limited and transient failures.
+           * If the page still fails, raise PartialFetchError carrying the messages collected so far.
            * Extract the conversation timeline and its entries.
            * For each entry, extract the message data if present.
            * Convert message timestamps from milliseconds to ISO format.
            * Append simplified message dicts to the list.
            * Check the timeline status and 'min_entry_id' to control pagination:
-               - Stop if status is "AT_END", no new min_entry_id, or if min_entry_id already seen.
-               - Otherwise, add new min_entry_id to seen set and update max_id to paginate.
+               - Stop if status is "AT_END", no new min_entry_id, or if min_entry_id was recently seen.
+               - Otherwise, record new min_entry_id (dropping the oldest once the window is full)
+                 and update max_id to paginate.
            * Increment the page count.
-       - Return the accumulated list of simplified messages.
+       - Return the accumulated list of simplified messages, and whether pagination was cut short by max_pages.
     """
     base_url = f"https://x.com/i/api/1.1/dm/conversation/{conversation_id}.json"
     simplified_messages = []
     seen_min_entry_ids = set()
+    seen_window = deque(maxlen=32)
     has_more = True
     max_id = None
     page_count = 0
 
-    async with aiohttp.ClientSession(headers=headers) as session:
-        while has_more:
-            params = {}
-            if max_id:
-                params['max_id'] = max_id
-
-            async with session.get(base_url, params=params, ssl=ssl_context) as resp:
-                if resp.status != 200:
-                    raise HTTPException(status_code=resp.status, detail=f"Error fetching page {page_count}")
-
-                data = await resp.json()
-                timeline = data.get("conversation_timeline", {})
-                entries = timeline.get("entries", [])
-
-                for entry in entries:
-                    message = entry.get("message", {})
-                    msg_data = message.get("message_data", {})
-
-                    if msg_data:
-                        timestamp_ms = msg_data.get("time")
-                        timestamp_dt = datetime.fromtimestamp(int(timestamp_ms) / 1000) if timestamp_ms else None
-
-                        simplified_messages.append({
-                            "sender_id": msg_data.get("sender_id"),
-                            "recipient_id": msg_data.get("recipient_id"),
-                            "text": msg_data.get("text"),
-                            "timestamp": timestamp_dt.isoformat() if timestamp_dt else None
-                        })
-
-                status = timeline.get("status")
-                new_min_entry_id = timeline.get("min_entry_id")
-
-                if status == "AT_END":
-                    has_more = False
-                elif not new_min_entry_id:
-                    has_more = False
-                elif new_min_entry_id in seen_min_entry_ids:
-                    has_more = False
-                else:
-                    seen_min_entry_ids.add(new_min_entry_id)
-                    max_id = new_min_entry_id
+    while has_more and page_count < max_pages:
+        params = {}
+        if max_id:
+            params['max_id'] = max_id
+
+        try:
+            data = await GetJSONWithRetry(
+                client, base_url, headers, params,
+                error_detail=f"Error fetching page {page_count}"
+            )
+        except HTTPException as e:
+            raise PartialFetchError(e.status_code, e.detail, simplified_messages)
+
+        timeline = data.get("conversation_timeline", {})
+        entries = timeline.get("entries", [])
+
+        for entry in entries:
+            message = entry.get("message", {})
+            msg_data = message.get("message_data", {})
+
+            if msg_data:
+                timestamp_ms = msg_data.get("time")
+                timestamp_dt = datetime.fromtimestamp(int(timestamp_ms) / 1000) if timestamp_ms else None
+
+                simplified_messages.append({
+                    "sender_id": msg_data.get("sender_id"),
+                    "recipient_id": msg_data.get("recipient_id"),
+                    "text": msg_data.get("text"),
+                    "timestamp": timestamp_dt.isoformat() if timestamp_dt else None
+                })
+
+        status = timeline.get("status")
+        new_min_entry_id = timeline.get("min_entry_id")
+
+        if status == "AT_END":
+            has_more = False
+        elif not new_min_entry_id:
+            has_more = False
+        elif new_min_entry_id in seen_min_entry_ids:
+            has_more = False
+        else:
+            if len(seen_window) == seen_window.maxlen:
+                seen_min_entry_ids.discard(seen_window[0])
+            seen_window.append(new_min_entry_id)
+            seen_min_entry_ids.add(new_min_entry_id)
+            max_id = new_min_entry_id
 
-                page_count += 1
+        page_count += 1
 
-    return simplified_messages
+    return simplified_messages, has_more
 
 
-@app.post("/fetch_dm/{conversation_id}")
+@app.post("/fetch_dm/{conversation_id}", response_model=None)
 async def fetch_dm_conversation(
     conversation_id: str = Path(..., description="The conversation ID to fetch"),
     auth_data: AuthData = ...
@@ -403,90 +549,107 @@ async def fetch_dm_conversation(
            * bearer_token [str]: Bearer token string for authorization.
 
     2) Returns:
-       - dict: A dictionary containing:
+       - ORJSONResponse: A JSON response containing:
            * conversation_id [str]: The requested conversation ID.
            * messages [List[dict]]: List of simplified messages returned by FetchDMConversations.
+           * truncated [bool]: True if the conversation has older messages beyond the page cap.
+           * error [str] (instead of truncated): Error message if a page failed after retries; messages then
+             holds everything fetched before the failure.
 
     3) Working:
        - Extract cookies and bearer token from the request body.
-       - Construct HTTP headers including authorization, user-agent, CSRF token, cookie header,
-         and other Twitter-specific headers needed for the API call.
-       - Create SSL context with certifi CA certificates for secure connection.
-       - Call the async helper function `FetchDMConversations` with conversation_id, headers, and ssl_context.
-       - Await the result which returns the list of simplified messages in that conversation.
-       - Return a JSON response containing the conversation ID and the fetched messages.
+       - Construct HTTP headers by merging STATIC_HEADERS with the authorization, CSRF token,
+         and cookie header.
+       - Call the async helper function `FetchDMConversations` with conversation_id, headers, and the shared client.
+       - Await the result which returns the list of simplified messages in that conversation and whether
+         it was truncated by the page cap.
+       - If a page fails after retries, catch the PartialFetchError and return the messages collected so far
+         together with the error (keeping the upstream failure status code) instead of discarding them.
+       - Return a JSON response containing the conversation ID, the fetched messages and the truncated flag.
     """
     cookies = auth_data.cookies
     bearer_token = auth_data.bearer_token
 
     headers = {
+        **STATIC_HEADERS,
         "Authorization": bearer_token,
-        "User-Agent": "Mozilla/5.0 ...",
         "x-csrf-token": cookies.get("ct0", ""),
         "Cookie": FormatCookieHeader(cookies),
-        'x-twitter-active-user': 'yes',
-        'x-twitter-auth-type': 'OAuth2Session',
-        'x-twitter-client-language': 'en',
-        'accept': 'application/json, text/plain, */*',
-        'origin': 'https://x.com',
-        'referer': 'https://x.com.messages',
-        'connection': 'keep-alive',
     }
 
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-    messages = await FetchDMConversations(conversation_id, headers, ssl_context)
-    return {"conversation_id": conversation_id, "messages": messages}
-
-async def FetchAllDMConversations(conversation_ids: List[str], headers: dict, ssl_context) -> List[Dict[str, Any]]:
+    try:
+        messages, truncated = await FetchDMConversations(conversation_id, headers, app.state.client)
+    except PartialFetchError as e:
+        return ORJSONResponse(
+            {"conversation_id": conversation_id, "messages": e.messages, "error": e.detail},
+            status_code=e.status_code
+        )
+    return ORJSONResponse({"conversation_id": conversation_id, "messages": messages, "truncated": truncated})
+
+async def IterDMConversations(
+    conversation_ids: List[str],
+    headers: dict,
+    client: httpx.AsyncClient,
+    max_concurrency: int = 20
+) -> AsyncIterator[Dict[str, Any]]:
     """
     1) Parameters:
        - conversation_ids [List[str]]: List of conversation IDs to fetch messages for.
        - headers [dict]: HTTP headers for authorization and cookies.
-       - ssl_context: SSL context for secure HTTPS requests.
+       - client [httpx.AsyncClient]: Shared HTTP client used for every conversation.
+       - max_concurrency [int]: Maximum number of conversations paginated at the same time (default 20).
 
     2) Returns:
-       - all_conversations [List[Dict[str, Any]]]: List of dictionaries, each representing a conversation with:
+       - AsyncIterator[Dict[str, Any]]: Yields one dictionary per conversation, in completion order, with:
            * conversation_id [str]: The conversation ID.
            * messages [List[Dict]]: List of simplified message dicts for that conversation.
+           * truncated [bool] (on success): True if the conversation has older messages beyond the page cap.
            * error [str] (optional): Error message if fetching failed for that conversation.
 
     3) Working:
-       - Calculate the total number of conversations to fetch.
-       - Create a list of async tasks to fetch each conversation concurrently using `FetchDMConversations`.
-       - Await completion of all tasks using `asyncio.gather`, allowing exceptions to be returned as results.
-       - Iterate through each conversation ID and its corresponding result:
-           * If the result is an Exception, log the failure and append a dict with empty messages and error.
-           * Otherwise, count the number of messages fetched, log success, and append the conversation data.
-       - Log the final count of successful scrapes.
-       - Return the list of all conversations with their messages or errors.
-    """
-    total_convos = len(conversation_ids)
-
-    tasks = [FetchDMConversations(convo_id, headers, ssl_context) for convo_id in conversation_ids]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    all_conversations = []
-    success_count = 0
-
-    for convo_id, res in zip(conversation_ids, results):
-        if isinstance(res, Exception):
-            all_conversations.append({
-                "conversation_id": convo_id,
-                "messages": [],
-                "error": str(res)
-            })
-        else:
-            msg_count = len(res)
-            success_count += 1
-            all_conversations.append({
-                "conversation_id": convo_id,
-                "messages": res
-            })
-
-    return all_conversations
-
-@app.post("/fetch_all_conversations")
+       - Create a semaphore bounding how many conversations have requests in flight on the shared client.
+       - Wrap `FetchDMConversations` in a helper that acquires the semaphore and pairs the conversation ID
+         with either its messages or the raised exception, and schedule one task per conversation.
+       - Iterate over the tasks with `asyncio.as_completed` and yield each conversation as soon as it finishes,
+         so callers can hand it off (and drop it) without holding every conversation in memory:
+           * If the result is an Exception, yield a dict with the error and any partial messages
+             carried by a PartialFetchError (empty otherwise).
+           * Otherwise, yield the conversation data with its truncated flag.
+       - Cancel any still-pending tasks if the consumer stops iterating early (e.g. client disconnect).
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(convo_id):
+        async with sem:
+            try:
+                return convo_id, await FetchDMConversations(convo_id, headers, client)
+            except Exception as e:
+                return convo_id, e
+
+    tasks = [asyncio.create_task(_one(convo_id)) for convo_id in conversation_ids]
+
+    try:
+        for coro in asyncio.as_completed(tasks):
+            convo_id, res = await coro
+            if isinstance(res, Exception):
+                yield {
+                    "conversation_id": convo_id,
+                    "messages": res.messages if isinstance(res, PartialFetchError) else [],
+                    "error": str(res)
+                }
+            else:
+                messages, truncated = res
+                yield {
+                    "conversation_id": convo_id,
+                    "messages": messages,
+                    "truncated": truncated
+                }
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/fetch_all_conversations", response_model=None)
 async def fetch_all_conversations(auth_data: AuthData):
     """
     1) Parameters:
@@ -495,61 +658,52 @@ async def fetch_all_conversations(auth_data: AuthData):
           * bearer_token [str]: Bearer token string for authorization.
 
     2) Returns:
-       - dict: JSON response containing:
+       - StreamingResponse | ORJSONResponse: JSON response containing:
           * conversations [List[Dict]]: List of conversations with messages and metadata.
           * message [str] (optional): Informational message if no conversations found.
 
     3) Working:
        - Extract cookies and bearer token from the request body.
-       - Construct HTTP headers including Authorization, User-Agent, CSRF token, Cookie header,
-         and other Twitter-specific headers required by the API.
-       - Create an SSL context with certifi CA certificates for secure HTTPS requests.
+       - Construct HTTP headers by merging STATIC_HEADERS with the Authorization, CSRF token,
+         and Cookie header.
+       - Reuse the shared HTTP client stored on app.state.
        - Define an inner async helper function `fetch_conversation_ids` that:
-          * Calls the Twitter inbox_initial_state API endpoint.
-          * Raises HTTPException if response status is not 200.
-          * Parses JSON response to extract unique conversation IDs using `ExtractConversationIds`.
+          * Fetches the first inbox_initial_state page via FetchInboxPage (shared with the other inbox endpoints' cache).
+          * Extracts unique conversation IDs using `ExtractConversationIds`, keeping inbox order (newest first).
        - Call `fetch_conversation_ids` to retrieve a list of conversation IDs.
        - If no conversation IDs are found, return early with an empty list and a message.
-       - Otherwise, call the async `FetchAllDMConversations` function with conversation IDs, headers, and ssl context,
-         which concurrently fetches all messages from each conversation.
-       - Return the aggregated conversations list in JSON response.
+       - Otherwise, stream the conversations list as JSON from the async generator `IterDMConversations`,
+         which concurrently fetches all messages from each conversation; each conversation is encoded with
+         orjson and flushed as soon as it completes, so the full result is never held in memory.
     """
     cookies = auth_data.cookies
     bearer_token = auth_data.bearer_token
 
     headers = {
+        **STATIC_HEADERS,
         "Authorization": bearer_token,
-        "User-Agent": "Mozilla/5.0 ...",
         "x-csrf-token": cookies.get("ct0", ""),
         "Cookie": FormatCookieHeader(cookies),
-        'x-twitter-active-user': 'yes',
-        'x-twitter-auth-type': 'OAuth2Session',
-        'x-twitter-client-language': 'en',
-        'accept': 'application/json, text/plain, */*',
-        'origin': 'https://x.com',
-        'referer': 'https://x.com.messages',
-        'connection': 'keep-alive',
     }
 
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-    async def fetch_conversation_ids(headers, ssl_context):
-        url = "https://twitter.com/i/api/1.1/dm/inbox_initial_state"
-        async with aiohttp.ClientSession(headers=headers) as session:
-            async with session.get(url, ssl=ssl_context) as resp:
-                if resp.status != 200:
-                    detail = await resp.text()
-                    raise HTTPException(status_code=resp.status, detail=detail)
-                data = await resp.json()
+    client = app.state.client
 
+    async def fetch_conversation_ids(headers, client):
+        data = await FetchInboxPage(client, headers)
         conversation_ids = ExtractConversationIds(data)
-        return list(set(conversation_ids))
+        return list(dict.fromkeys(conversation_ids))
 
-    conversation_ids = await fetch_conversation_ids(headers, ssl_context)
+    conversation_ids = await fetch_conversation_ids(headers, client)
 
     if not conversation_ids:
-        return {"conversations": [], "message": "No conversations found"}
+        return ORJSONResponse({"conversations": [], "message": "No conversations found"})
 
-    all_conversations = await FetchAllDMConversations(conversation_ids, headers, ssl_context)
+    async def stream_conversations():
+        yield b'{"conversations":['
+        i = 0
+        async for convo in IterDMConversations(conversation_ids, headers, client):
+            yield (b',' if i else b'') + orjson.dumps(convo)
+            i += 1
+        yield b']}'
 
-    return {"conversations": all_conversations}
+    return StreamingResponse(stream_conversations(), media_type="application/json")
@@ -0,0 +1,13 @@
+#!/usr/bin/env sh
+# Production entrypoint: one uvicorn worker per CPU core.
+# Each worker gets its own shared HTTP client and inbox cache via the app's startup hook.
+# Override with HOST, PORT and WORKERS environment variables.
+WORKERS="${WORKERS:-$(nproc 2>/dev/null || sysctl -n hw.ncpu 2>/dev/null || echo 1)}"
+
+exec uvicorn app:app \
+    --host "${HOST:-127.0.0.1}" \
+    --port "${PORT:-8000}" \
+    --workers "$WORKERS" \
+    --loop uvloop \
+    --http httptools \
+    --no-access-log